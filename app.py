@@ -26,23 +26,66 @@ Routes:
 - `/delete_question/<question_id>` (Deletes an existing question)
 - `/add_question` (Add a new question - Admin only)
 - `/api/questions` (Retrieve questions via API)
+
+CLI commands:
+- `flask --app app init-db` (Create the database tables)
 """
 from flask import abort, render_template, request, redirect, url_for, session, flash
+from jinja2 import FileSystemBytecodeCache
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from flask_session import Session
 from model import app, db, User, Question, QuizResult
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload, load_only
 from functools import wraps
-
+import click
+from passwords import hash_password, verify_password, needs_rehash
+import question_cache
+import os
+import redis
+
+
+# Cache compiled templates on disk so each new worker doesn't recompile them
+_jinja_cache_dir = os.path.join(app.instance_path, 'jinja_cache')
+os.makedirs(_jinja_cache_dir, exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(_jinja_cache_dir)
+
+# Storing sessions server-side in redis when configured, so the cookie only carries
+# the session ID instead of the whole signed quiz state. Falls back to signed cookies.
+if os.getenv('SESSION_REDIS_URL'):
+    app.config.update(
+        SESSION_TYPE='redis',
+        SESSION_REDIS=redis.from_url(os.getenv('SESSION_REDIS_URL'))
+    )
+    Session(app)
 
 # Setting up Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+# Setting up Flask-Limiter, so login/register attempts (and the password hashing
+# they trigger) can't be spammed. Use a shared storage such as redis:// in production.
+limiter = Limiter(
+    get_remote_address,
+    app=app,
+    storage_uri=os.getenv('RATELIMIT_STORAGE_URI', 'memory://'),
+    default_limits=[]
+)
+
+# Limit applied to login/register form submissions
+AUTH_RATE_LIMIT = "5 per minute;20 per hour"
+
+# Number of users/questions listed per page on the admin dashboard
+ADMIN_PAGE_SIZE = 50
+
 
 def admin_required(f):
     """
     A decorator to restrict access to routes to admin-only routes.
+    `current_user` is already loaded (with `is_admin`) by `load_user`, so this costs no extra query.
     Args:
         f (function): The route function to decorate.
 
@@ -62,12 +105,17 @@ def admin_required(f):
 @admin_required
 def admin_dashboard():
     """
-    Renders the admin dashboard with all users and questions.
+    Renders the admin dashboard with a page of users and a page of questions.
+    The pages are selected with the `users_page` and `questions_page` query args.
     Returns:
        str: Rendered HTML page for the dashboard.
     """
-    users = User.query.all()
-    questions = Question.query.all()
+    users = User.query.options(load_only(User.id, User.username, User.is_admin)).order_by(User.id).paginate(
+        page=request.args.get('users_page', 1, type=int), per_page=ADMIN_PAGE_SIZE, error_out=False
+    )
+    questions = Question.query.options(load_only(Question.id, Question.question)).order_by(Question.id).paginate(
+        page=request.args.get('questions_page', 1, type=int), per_page=ADMIN_PAGE_SIZE, error_out=False
+    )
     return render_template('admin.html', users=users, questions=questions)
 
 
@@ -103,8 +151,9 @@ def delete_user(user_id):
         Redirect: Redirects to teh admin dashboard.
     """
     user = User.query.get_or_404(user_id)
+    # Delete the results explicitly too: databases created before the FK got
+    # ON DELETE CASCADE would otherwise reject the user delete
     QuizResult.query.filter_by(user_id=user.id).delete()
-    db.session.commit()
     db.session.delete(user)
     db.session.commit()
     flash("User deleted successfully.", "success")
@@ -134,6 +183,7 @@ def edit_question(question_id):
         question.answer = request.form['answer']
 
         db.session.commit()
+        question_cache.invalidate()
         flash('Question updated successfully!', 'success')
         return redirect(url_for('admin_dashboard'))
 
@@ -155,6 +205,7 @@ def delete_question(question_id):
     question = Question.query.get_or_404(question_id)
     db.session.delete(question)
     db.session.commit()
+    question_cache.invalidate()
     flash("Question deleted successfully.", "success")
     return redirect(url_for('admin_dashboard'))
 
@@ -163,6 +214,8 @@ def delete_question(question_id):
 def load_user(user_id):
     """
     Loads a user by their ID for Flask-Login.
+    Runs on every authenticated request, so only the columns the app needs
+    from `current_user` are loaded (the password hash is left deferred).
 
     Args:
         user_id (int): The ID of the user to be loaded.
@@ -170,7 +223,7 @@ def load_user(user_id):
     Returns:
         User: The user object associated with the given ID.
     """
-    return User.query.get(int(user_id))
+    return db.session.get(User, int(user_id), options=[load_only(User.id, User.username, User.is_admin)])
 
 
 @app.route('/')
@@ -184,6 +237,7 @@ def index():
 
 
 @app.route('/register', methods=['GET', 'POST'])
+@limiter.limit(AUTH_RATE_LIMIT, methods=['POST'])
 def register():
     """
     Handles user registeration. The first user is automatically admin.
@@ -195,19 +249,16 @@ def register():
         username = request.form['username']
         password = request.form['password']
 
-        # Hash the password using pbkdf2:sha256
-        hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
-
         # Check if user already exists
-        existing_user = User.query.filter_by(username=username).first()
-        if existing_user:
+        if db.session.query(User.query.filter_by(username=username).exists()).scalar():
             flash('Username already taken!', 'danger')
             return redirect(url_for('register'))
 
         # Check if this is the first user
-        is_admin = False
-        if not User.query.first():  # First user is the admin
-            is_admin = True
+        is_admin = not db.session.query(User.query.exists()).scalar()  # First user is the admin
+
+        # Hash the password using argon2
+        hashed_password = hash_password(password)
 
         # Create new user
         new_user = User(username=username, password=hashed_password, is_admin=is_admin)
@@ -220,6 +271,8 @@ def register():
 
 
 @app.route('/login', methods=['GET', 'POST'])
+@limiter.limit(AUTH_RATE_LIMIT, methods=['POST'])
+@limiter.limit(AUTH_RATE_LIMIT, methods=['POST'], key_func=lambda: request.form.get('username', ''))
 def login():
     """
     Handes user login. Redirects admins to the adin dashboard.
@@ -237,9 +290,14 @@ def login():
         if not user:
             flash('Username does not exist.', 'danger')
             return redirect(url_for('login'))
-        elif not check_password_hash(user.password, password):
+        elif not verify_password(user.password, password):
             flash('Incorrect password. Please try again.', 'danger')
             return redirect(url_for('login'))
+
+        # Upgrade legacy pbkdf2 hashes to argon2 now that we know the password
+        if needs_rehash(user.password):
+            user.password = hash_password(password)
+            db.session.commit()
         login_user(user)
         flash('Login successful!', 'success')
         if user.is_admin:
@@ -275,9 +333,13 @@ def quiz():
         session['score'] = 0
         session['questions_answered'] = 0
 
+        # Snapshot the question IDs so the quiz stays stable if questions change mid-quiz
+        session['quiz_ids'] = [q['id'] for q in question_cache.get_questions()]
+        session['total_questions'] = len(session['quiz_ids'])
+
         # Redirect to the quiz questions
         return redirect(url_for('next_question', question_number=1))
-    questions = Question.query.all()
+    questions = question_cache.get_questions()
     session['total_questions'] = len(questions)
     return render_template('quiz.html', questions=questions)
 
@@ -292,22 +354,33 @@ def next_question(question_number):
 
     Returns:
         str: Rendered HTML page for the question.
-        Redirect: Redirects to the next question or the results page if quiz ends.
+        Redirect: Redirects to the next question, or submits the quiz after the last one.
     """
-    question = Question.query.get(question_number)
-    if not question:
-        return redirect(url_for('result'))
+    quiz_ids = session.get('quiz_ids')
+    if quiz_ids is None:
+        return redirect(url_for('quiz'))
+    if question_number < 1:
+        return redirect(url_for('next_question', question_number=1))
+    if question_number > len(quiz_ids):
+        # Past the last question (e.g. it was deleted mid-quiz, or the quiz is empty)
+        return _finish_quiz()
+
+    question = question_cache.get_question(quiz_ids[question_number - 1])
+    if not question:  # Deleted since the quiz started
+        return redirect(url_for('next_question', question_number=question_number + 1))
 
     if request.method == 'POST':
         user_answer = request.form.get('answer')
-        correct_answer = question.answer
+        correct_answer = question['answer']
         if user_answer == correct_answer:
             session['score'] += 1
         session['questions_answered'] += 1
+        if question_number == len(quiz_ids):
+            # 307 keeps the POST method so the quiz gets submitted
+            return redirect(url_for('submit_quiz'), code=307)
         return redirect(url_for('next_question', question_number=question_number + 1))
 
-    options = [question.option_a, question.option_b, question.option_c, question.option_d]
-    return render_template('question.html', question=question, question_number=question_number, options=options, total_questions=Question.query.count())
+    return render_template('question.html', question=question, question_number=question_number, total_questions=len(quiz_ids))
 
 
 @app.route('/submit_quiz', methods=['POST'])
@@ -315,6 +388,18 @@ def next_question(question_number):
 def submit_quiz():
     """
     Handes the submission of the quiz and stores the results in the db.
+    Returns:
+        Redirect: Redirects to the quiz results page, or to the quiz page if no quiz is in progress.
+    """
+    if 'quiz_ids' not in session:  # Already submitted, or never started
+        return redirect(url_for('quiz'))
+    return _finish_quiz()
+
+
+def _finish_quiz():
+    """
+    Stores the in-progress quiz's result in the db and clears the quiz from the session.
+    Callers must check that a quiz is in progress (`'quiz_ids' in session`).
     Returns:
         Redirect: Redirects to the quiz results page.
     """
@@ -322,16 +407,18 @@ def submit_quiz():
     total_questions = session.get('total_questions', 0)
 
     # Create new quiz result entry
-    quiz_result = QuizResult(user_id=current_user.id, score=score, total_questions=total_questions)
+    quiz_result = QuizResult(user_id=current_user.id, score=score, total=total_questions)
     db.session.add(quiz_result)
     db.session.commit()
+    session['last_result_id'] = quiz_result.id
 
     # Reset session values after submitting quiz
     session.pop('score', None)
     session.pop('questions_answered', None)
+    session.pop('quiz_ids', None)
 
     flash('Quiz submitted successfully!', 'success')
-    return redirect(url_for('quiz_results'))
+    return redirect(url_for('result'))
 
 
 @app.route('/result')
@@ -339,26 +426,31 @@ def submit_quiz():
 def result():
     """
     Display the suer's quiz resuts and the leaderboard.
+    The result itself is saved by `submit_quiz`, this route only reads.
     Returns:
         str: Rendered HTML page for the quiz results.
     """
-    score = session.get('score', 0)
-    total = Question.query.count()
-
-    # Save the result to the database
-    result = QuizResult(score=score, total=total, user_id=current_user.id)
-    db.session.add(result)
-    db.session.commit()
-
-    # Fetch scores
-    user_high_score = QuizResult.query.filter_by(user_id=current_user.id).order_by(QuizResult.score.desc()).first()
-    leaderboard = QuizResult.query.order_by(QuizResult.score.desc()).limit(10).all()
+    # Fetch the result saved by the last submitted quiz
+    last_result = None
+    if 'last_result_id' in session:
+        last_result = QuizResult.query.filter_by(id=session['last_result_id'], user_id=current_user.id).first()
+    score = last_result.score if last_result else 0
+    total = last_result.total if last_result else question_cache.get_question_count()
+
+    # Fetch the leaderboard and the user's high score in a single query
+    user_high_score = db.session.query(db.func.max(QuizResult.score)).filter(
+        QuizResult.user_id == current_user.id
+    ).scalar_subquery()
+    rows = db.session.query(QuizResult, user_high_score).options(
+        joinedload(QuizResult.user)
+    ).order_by(QuizResult.score.desc()).limit(10).all()
+    leaderboard = [entry for entry, _ in rows]
 
     return render_template(
         'result.html',
         score=score,
         total=total,
-        user_high_score=user_high_score.score if user_high_score else 0,
+        user_high_score=(rows[0][1] or 0) if rows else 0,
         leaderboard=leaderboard,
         enumerate=enumerate
     )
@@ -412,18 +504,15 @@ def add_question():
                 'answer': correct_answer
             })
 
-        # Save the new questions to the database
-        for data in question_data:
-            new_question = Question(
-                question=data['question'],
-                option_a=data['option_a'],
-                option_b=data['option_b'],
-                option_c=data['option_c'],
-                option_d=data['option_d'],
-                answer=data['answer']
-            )
-            db.session.add(new_question)
+        # An empty list would make the INSERT below fall back to DEFAULT VALUES
+        if not question_data:
+            flash('Please add at least one question.', 'danger')
+            return redirect(url_for('add_question'))
+
+        # Save the new questions to the database in a single executemany INSERT
+        db.session.execute(insert(Question), question_data)
         db.session.commit()
+        question_cache.invalidate()
 
         flash('Questions added successfully!', 'success')
         return redirect(url_for('admin_dashboard'))  # Redirect to dashboard
@@ -435,20 +524,27 @@ def add_question():
 def get_questions():
     """
     Provide an API endpoint to retrieve all quiz questions.
+    The response carries an ETag so clients can revalidate and get a 304.
     Returns:
-        dict: JSON response containing a list of all questions & their details.
+        Response: JSON response containing a list of all questions & their details.
+    """
+    body, etag = question_cache.get_questions_json()
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True  # Always revalidate, questions can change
+    return response.make_conditional(request)
+
+
+@app.cli.command('init-db')
+def init_db():
+    """
+    Creates the database tables. Run once with `flask --app app init-db`
+    before starting the server, so workers don't race to create them.
     """
-    questions = Question.query.all()
-    question_list = [{
-        "id": q.id,
-        "question": q.question,
-        "options": [q.option_a, q.option_b, q.option_c, q.option_d],
-        "answer": q.answer  # Remove this if exposing answers is not intended
-    } for q in questions]
-    return {"questions": question_list}, 200
+    db.create_all()
+    click.echo('Initialized the database.')
 
 
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
-    app.run(debug=True)
+    # Development server only, use gunicorn in production (see README)
+    app.run()
@@ -14,8 +14,9 @@ Data configuration:
 from flask import Flask
 from flask_login import UserMixin
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 import os
-from datetime import datetime
 
 # The flask app
 app = Flask(__name__)
@@ -23,7 +24,26 @@ app = Flask(__name__)
 # Configuring the database
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'default_secret_key')
-db = SQLAlchemy(app)
+# Don't expire loaded objects on commit, the app never relies on reloading them afterwards
+db = SQLAlchemy(app, session_options={'expire_on_commit': False})
+
+
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragma(dbapi_connection, connection_record):
+    """
+    Configures every new SQLite connection.
+    SQLite doesn't enforce foreign keys by default, so turn them on
+    to let `ON DELETE CASCADE` remove a deleted user's quiz results.
+    WAL mode lets quiz readers run alongside writers, and the larger
+    page cache (64 MB) keeps the hot tables in memory.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
 
 
 class User(UserMixin, db.Model):
@@ -40,7 +60,8 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(150), unique=True, nullable=False)
     password = db.Column(db.String(150), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
-    results = db.relationship('QuizResult', backref='user', lazy=True)
+    results = db.relationship('QuizResult', back_populates='user', lazy='select',
+                              cascade='all, delete-orphan', passive_deletes=True)
 
 
 class QuizResult(db.Model):
@@ -51,13 +72,23 @@ class QuizResult(db.Model):
         score (int): The score achieved in the quiz.
         total (int): The total number of questions in the quiz.
         user_id (int): The Id of the user who took the quiz.
-        date (datetime): The date and time the quiz was taken.
+        date (datetime): The date and time (UTC) the quiz was taken, set by the database.
+        user (User): The user who took the quiz.
     """
     id = db.Column(db.Integer, primary_key=True)
     score = db.Column(db.Integer, nullable=False)
     total = db.Column(db.Integer, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    date = db.Column(db.DateTime, default=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    # `default` puts CURRENT_TIMESTAMP in the INSERT itself, so it also works on databases
+    # created before `server_default` was added to the column
+    date = db.Column(db.DateTime(timezone=True), default=db.func.now(), server_default=db.func.now(), nullable=False)
+    user = db.relationship('User', back_populates='results')
+
+    # Indexes for the leaderboard and the per-user high score, both ordered by score
+    __table_args__ = (
+        db.Index('ix_quizresult_score_desc', score.desc()),
+        db.Index('ix_quizresult_user_score', user_id, score.desc()),
+    )
 
 
 class Question(db.Model):
@@ -0,0 +1,109 @@
+"""
+passwords.py
+
+This module handles hashing and verifying user passwords with argon2.
+Passwords hashed by older versions of the app (werkzeug's pbkdf2:sha256) are still
+accepted, and should be rehashed with argon2 after a successful login.
+Verification results are kept in a small in-process LRU cache so repeated checks
+of the same password against the same hash don't pay the hashing cost again.
+
+Functions:
+- `hash_password()`: Hashes a plain-text password.
+- `verify_password()`: Checks a plain-text password against a stored hash.
+- `needs_rehash()`: Tells whether a stored hash should be replaced with a fresh argon2 hash.
+"""
+from collections import OrderedDict
+import hashlib
+import hmac
+import os
+import threading
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError, VerifyMismatchError
+from werkzeug.security import check_password_hash
+
+# The argon2 hasher used for all new passwords
+ph = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=2)
+
+# Prefix of every hash produced by argon2
+ARGON2_PREFIX = '$argon2'
+
+# Max number of (hash, password tag) pairs kept in the verification cache
+VERIFY_CACHE_SIZE = 1024
+
+# Per-process key used to tag passwords, so plain-text passwords never enter the cache
+_PEPPER = os.urandom(32)
+
+_verify_cache = OrderedDict()
+_verify_cache_lock = threading.Lock()
+
+
+def hash_password(password):
+    """
+    Hashes a password using argon2.
+    Args:
+        password (str): The plain-text password.
+
+    Returns:
+        str: The encoded argon2 hash.
+    """
+    return ph.hash(password)
+
+
+def verify_password(stored_hash, password):
+    """
+    Checks a password against a stored hash, using the verification cache.
+    The cache is keyed on the stored hash, so changing a password (or rehashing it)
+    naturally stops old entries from matching.
+    Args:
+        stored_hash (str): The hash stored for the user, either argon2 or legacy werkzeug.
+        password (str): The plain-text password to check.
+
+    Returns:
+        bool: True if the password matches the hash.
+    """
+    key = (stored_hash, hmac.new(_PEPPER, password.encode(), hashlib.sha256).digest())
+    with _verify_cache_lock:
+        if key in _verify_cache:
+            _verify_cache.move_to_end(key)
+            return _verify_cache[key]
+
+    result = _verify(stored_hash, password)
+
+    with _verify_cache_lock:
+        _verify_cache[key] = result
+        if len(_verify_cache) > VERIFY_CACHE_SIZE:
+            _verify_cache.popitem(last=False)
+    return result
+
+
+def _verify(stored_hash, password):
+    """
+    Checks a password against a stored hash, without caching.
+    Args:
+        stored_hash (str): The hash stored for the user.
+        password (str): The plain-text password to check.
+
+    Returns:
+        bool: True if the password matches the hash.
+    """
+    if not stored_hash.startswith(ARGON2_PREFIX):
+        return check_password_hash(stored_hash, password)
+    try:
+        return ph.verify(stored_hash, password)
+    except (VerifyMismatchError, VerificationError, InvalidHashError):
+        return False
+
+
+def needs_rehash(stored_hash):
+    """
+    Tells whether a stored hash is a legacy hash or uses outdated argon2 parameters.
+    Args:
+        stored_hash (str): The hash stored for the user.
+
+    Returns:
+        bool: True if the password should be rehashed.
+    """
+    if not stored_hash.startswith(ARGON2_PREFIX):
+        return True
+    return ph.check_needs_rehash(stored_hash)
+
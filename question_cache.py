@@ -0,0 +1,133 @@
+"""
+question_cache.py
+
+This module keeps an in-process cache of the quiz questions so the quiz routes
+don't have to query the database every time a question is rendered.
+Each worker process has its own cache, invalidation is shared between workers
+through a marker file in the instance folder.
+
+Functions:
+- `get_questions()`: Returns the list of all questions, loading it from the db on a cache miss.
+- `get_question()`: Returns a single question by its ID.
+- `get_question_count()`: Returns the total number of questions.
+- `get_questions_json()`: Returns the serialized `/api/questions` response body and its ETag.
+- `invalidate()`: Clears the cache. Must be called whenever questions are added, edited or deleted.
+"""
+import hashlib
+import os
+import uuid
+import orjson
+from model import app, db, Question
+
+# Cached (questions list, questions keyed by ID, API body, API ETag, version) tuple, `None` until
+# the first lookup (or after invalidation). Kept as a single tuple so it's swapped atomically.
+_cache = None
+
+# Replaced on every invalidation so other worker processes notice their cache is stale
+_VERSION_FILE = os.path.join(app.instance_path, 'question_cache.version')
+
+
+def _version():
+    """
+    Returns the current version of the questions, as seen by all worker processes.
+    Returns:
+        tuple: The inode and modification time of the version file.
+    """
+    try:
+        stat = os.stat(_VERSION_FILE)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def _load():
+    """
+    Returns the cached questions, loading them from the database on a cache miss.
+    Returns:
+        tuple: The list of question dicts, the same questions keyed by ID,
+            the serialized API body, its ETag and the version it was loaded at.
+    """
+    global _cache
+    cache = _cache
+    version = _version()
+    if cache is None or cache[4] != version:
+        # Select plain column tuples, no ORM objects are needed for a read-only cache
+        rows = db.session.query(
+            Question.id,
+            Question.question,
+            Question.option_a,
+            Question.option_b,
+            Question.option_c,
+            Question.option_d,
+            Question.answer
+        ).order_by(Question.id).all()
+        # Precompute each question's options once, instead of on every render
+        questions = [
+            dict(row._asdict(), options=(row.option_a, row.option_b, row.option_c, row.option_d))
+            for row in rows
+        ]
+        body = orjson.dumps({"questions": [{
+            "id": q_id,
+            "question": text,
+            "options": [a, b, c, d],
+            "answer": answer  # Remove this if exposing answers is not intended
+        } for q_id, text, a, b, c, d, answer in rows]})
+        etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+        cache = _cache = (questions, {q['id']: q for q in questions}, body, etag, version)
+    return cache
+
+
+def get_questions():
+    """
+    Returns all the quiz questions ordered by their ID.
+    Returns:
+        list: A list of question dicts.
+    """
+    return _load()[0]
+
+
+def get_question(question_id):
+    """
+    Returns a single quiz question.
+    Args:
+        question_id (int): The ID of the question.
+
+    Returns:
+        dict: The question, or None if it doesn't exist.
+    """
+    return _load()[1].get(question_id)
+
+
+def get_question_count():
+    """
+    Returns the total number of quiz questions.
+    Returns:
+        int: The number of questions.
+    """
+    return len(get_questions())
+
+
+def get_questions_json():
+    """
+    Returns the `/api/questions` response body, serialized once per cache load.
+    Returns:
+        tuple: The JSON body (bytes) and its ETag (str).
+    """
+    cache = _load()
+    return cache[2], cache[3]
+
+
+def invalidate():
+    """
+    Clears the cached questions so the next lookup reloads them from the database,
+    in this worker and in any other worker process.
+    """
+    global _cache
+    _cache = None
+
+    # Atomically replace the version file, giving it a new inode
+    os.makedirs(app.instance_path, exist_ok=True)
+    tmp_file = f'{_VERSION_FILE}.{uuid.uuid4().hex}'
+    with open(tmp_file, 'w') as f:
+        f.write(tmp_file)
+    os.replace(tmp_file, _VERSION_FILE)